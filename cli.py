@@ -1,10 +1,13 @@
 import asyncio
 import logging
+import sys
+import threading
+from enum import IntEnum
 from core.market_utils import MarketUtils
 from core.account_utils import AccountUtils
 from core.realtime_market_data import RealTimeMarketDataProvider
 from strategies.best_order import BestOrderStrategy
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from x10.perpetual.accounts import StarkPerpetualAccount
 from x10.perpetual.configuration import MAINNET_CONFIG
@@ -14,6 +17,12 @@ from x10.utils.log import get_logger
 from x10.utils.model import X10BaseModel
 from x10.perpetual.orders import OrderSide
 
+try:
+    # uvloop is an optional, faster drop-in event loop for the WebSocket and REST traffic.
+    import uvloop
+except ImportError:
+    uvloop = None
+
 
 logging.basicConfig(
     level=logging.WARNING, 
@@ -26,6 +35,24 @@ logging.getLogger("TradingCLI").setLevel(logging.WARNING)
 logging.getLogger("strategies.best_order").setLevel(logging.WARNING) 
 logging.getLogger("core.realtime_market_data").setLevel(logging.WARNING)
 
+# Row layout of the 'markets' table: name, last price, 24h volume.
+MARKET_ROW_FMT = "{:<12} {:>14,.4f} {:>18,.2f}".format
+
+# Order-command side tags, mapped to the side passed to BestOrderStrategy.
+SIDES = {"BB": "buy", "BA": "sell"}
+
+class PriceStatus(IntEnum):
+    """Where a position's displayed current price came from."""
+    NONE = 0        # No price found yet
+    LIVE_EMPTY = 1  # Live data present, but without bid/ask
+    LIVE_OK = 2     # Live bid and/or ask from the WebSocket stream
+    REST = 3        # Last price from the (cached) REST market data
+
+def _normalize_market(name: str) -> str:
+    """Uppercase a market name and append '-USD' when no quote asset is given (e.g. 'btc' -> 'BTC-USD')."""
+    name = name.upper()
+    return name if "-" in name else name + "-USD"
+
 class TradingCLI:
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__) 
@@ -51,6 +78,10 @@ class TradingCLI:
         )
         self.running = True
         self._running_cli_task = None
+        # Orders queued between 'batch begin' and 'batch commit'; None when no batch is open.
+        self._pending_orders: Optional[List[Tuple[str, str, float]]] = None
+        # Set by the command loop when it is ready for the next input line.
+        self._input_requested = threading.Event()
 
     async def execute_order(self, market: str, price_offset: float, side: str, amount_usd: float):
         # This method is now effectively deprecated by user request to remove the general 'order' command
@@ -69,102 +100,116 @@ class TradingCLI:
     async def show_markets(self, top_n=None):
         """Display available markets as an aligned table, sorted by 24h volume descending."""
         try:
-            markets = await self.market_utils.get_markets(top_n)
-            valid_markets = []
-            for m in markets:
-                try:
-                    if hasattr(m, 'market_stats') and hasattr(m.market_stats, 'daily_volume') and m.market_stats.daily_volume is not None:
-                        volume = float(m.market_stats.daily_volume)
-                        if volume > 0:
-                            valid_markets.append(m)
-                except (ValueError, TypeError) as e:
-                    self.logger.warning(f"Could not parse volume for market {getattr(m, 'name', 'Unknown')} : {e}")
-
-            valid_markets.sort(key=lambda m: float(m.market_stats.daily_volume), reverse=True)
-            
-            if top_n is not None:
-                markets_to_display = valid_markets[:top_n]
-            else:
-                markets_to_display = valid_markets
+            markets_to_display = await self.market_utils.get_market_rows(top_n)
                 
-            print("\n{:<12} {:>14} {:>18}".format("Market", "Last Price", "24h Volume"))
-            print("-"*48)
-            for market_obj in markets_to_display:
-                name = market_obj.name
-                if name.upper().endswith('-USD'):
+            lines = ["\n{:<12} {:>14} {:>18}".format("Market", "Last Price", "24h Volume"), "-"*48]
+            for row in markets_to_display:
+                name = row.name
+                if name.endswith('-USD'):
                     name = name[:-4]
-                price = market_obj.market_stats.last_price if hasattr(market_obj.market_stats, 'last_price') else 'N/A'
-                volume = market_obj.market_stats.daily_volume
-                print(f"{name:<12} {float(price):>14,.4f} {float(volume):>18,.2f}")
-            print("-"*48)
+                lines.append(MARKET_ROW_FMT(name, row.last_price, row.daily_volume))
+            lines.append("-"*48)
+            sys.stdout.write("\n".join(lines) + "\n")
         except Exception as e:
-            self.logger.error(f"Error while fetching markets: {str(e)}", exc_info=True)
+            self.logger.error("Error while fetching markets: %s", e, exc_info=True)
+
+    async def _get_display_price(self, market_name_for_pos: str) -> str:
+        """Resolve the best available current price for a position's market, as a display string."""
+        current_display_price = "N/A"
+        status = PriceStatus.NONE
+
+        # 1. Try RealTimeMarketDataProvider (WebSocket)
+        if self.realtime_data_provider:
+            live_price_data = self.realtime_data_provider.get_best_bid_ask(market_name_for_pos)
+            if live_price_data:
+                bid = live_price_data.bid_price
+                ask = live_price_data.ask_price
+                status = PriceStatus.LIVE_OK
+                if bid and ask:
+                    current_display_price = f"Live Bid: {bid}, Ask: {ask}"
+                elif bid:
+                    current_display_price = f"Live Bid: {bid}"
+                elif ask:
+                    current_display_price = f"Live Ask: {ask}"
+                else:
+                    status = PriceStatus.LIVE_EMPTY
+                    current_display_price = "Live data found, but no bid/ask price."
 
-    async def show_position(self, market: Optional[str] = None):
-        """Display the current position."""
+        # 2. If no live price, try MarketUtils (REST API, cached)
+        if status is PriceStatus.NONE or status is PriceStatus.LIVE_EMPTY:
+            if self.market_utils:
+                market_obj = await self.market_utils.get_market_object(market_name_for_pos)
+                try:
+                    last_price = market_obj.market_stats.last_price
+                except AttributeError: # No market object, or no stats on it
+                    last_price = None
+                if last_price is not None:
+                    status = PriceStatus.REST
+                    current_display_price = f"Last (REST): {last_price}"
+                elif status is PriceStatus.NONE: # Only update if it was truly N/A, not if live data was found but empty
+                     current_display_price = "Last price (REST) not available."
+
+        return current_display_price
+
+    async def show_position(self, markets: Optional[List[str]] = None):
+        """Display the current positions, optionally limited to the given markets (fetched in one request)."""
         try:
-            positions = await self.account_utils.get_positions(market)
+            positions = await self.account_utils.get_positions(markets)
             
             if not positions:
                 print("No open positions")
                 return
 
+            # Resolve the current price of every position concurrently rather than one market at a time.
+            display_prices = await asyncio.gather(
+                *(self._get_display_price(pos.market) for pos in positions),
+                return_exceptions=True
+            )
+
             print("\nCurrent positions:")
             print("------------------")
-            for pos in positions:
+            for pos, current_display_price in zip(positions, display_prices):
+                if isinstance(current_display_price, Exception):
+                    self.logger.error("Error resolving current price for %s: %s", pos.market, current_display_price)
+                    current_display_price = "N/A"
+
                 print(f"Market: {pos.market}")
                 print(f"Size: {pos.size}")
                 print(f"Entry price: {pos.open_price}")
-                
-                # Attempt to get a more current market price
-                current_display_price = "N/A"
-                market_name_for_pos = pos.market # Assuming pos.market gives "BTC-USD" etc.
-                
-                # 1. Try RealTimeMarketDataProvider (WebSocket)
-                if self.realtime_data_provider:
-                    live_price_data = await self.realtime_data_provider.get_best_bid_ask(market_name_for_pos)
-                    if live_price_data:
-                        bid = live_price_data.get('bid_price')
-                        ask = live_price_data.get('ask_price')
-                        if bid and ask:
-                            current_display_price = f"Live Bid: {bid}, Ask: {ask}"
-                        elif bid:
-                            current_display_price = f"Live Bid: {bid}"
-                        elif ask:
-                            current_display_price = f"Live Ask: {ask}"
-                        else:
-                            current_display_price = "Live data found, but no bid/ask price."
-                
-                # 2. If no live price, try MarketUtils (REST API, cached)
-                if current_display_price == "N/A" or "Live data found, but no bid/ask price." in current_display_price:
-                    if self.market_utils:
-                        market_obj = await self.market_utils.get_market_object(market_name_for_pos)
-                        if market_obj and hasattr(market_obj, 'market_stats') and hasattr(market_obj.market_stats, 'last_price') and market_obj.market_stats.last_price is not None:
-                            current_display_price = f"Last (REST): {market_obj.market_stats.last_price}"
-                        elif current_display_price == "N/A": # Only update if it was truly N/A, not if live data was found but empty
-                             current_display_price = "Last price (REST) not available."
-
                 print(f"Current Market Price: {current_display_price}")
                 print(f"Unrealized P&L: {pos.unrealised_pnl}")
                 print("------------------")
         except Exception as e:
-            self.logger.error(f"Error while fetching positions: {str(e)}", exc_info=True)
+            self.logger.error("Error while fetching positions: %s", e, exc_info=True)
 
     async def execute_best_order(self, market: str, side: str, amount_usd: float):
         """Place an order at the best bid or ask price using BestOrderStrategy (now with real-time data)."""
-        normalized_market_name = market.upper()
-        if not normalized_market_name.endswith("-USD") and "-" not in normalized_market_name:
-            normalized_market_name += "-USD"
+        normalized_market_name = _normalize_market(market)
 
         try:
-            self.logger.info(f"[CLI] Delegating to BestOrderStrategy for {normalized_market_name} {side} {amount_usd} USD (using real-time prices).")
+            self.logger.info("[CLI] Delegating to BestOrderStrategy for %s %s %s USD (using real-time prices).", normalized_market_name, side, amount_usd)
             await self.best_order_strategy.execute(
                 market=normalized_market_name, 
                 side=side, 
                 amount_usd=amount_usd
             )
         except Exception as e:
-            self.logger.error(f"Error placing order for {normalized_market_name}: {str(e)}", exc_info=True)
+            self.logger.error("Error placing order for %s: %s", normalized_market_name, e, exc_info=True)
+
+    async def execute_batch_orders(self, orders: List[Tuple[str, str, float]]):
+        """Place all queued (market, side, amount_usd) orders at once using BestOrderStrategy.execute_batch."""
+        if not orders:
+            print("Batch is empty, nothing to place.")
+            return
+
+        try:
+            self.logger.info("[CLI] Delegating batch of %s orders to BestOrderStrategy.", len(orders))
+            order_ids = await self.best_order_strategy.execute_batch(orders)
+            for (market, side, amount_usd), order_id in zip(orders, order_ids):
+                status = f"placed (ID: {order_id})" if order_id else "FAILED"
+                print(f"{market} {side} {amount_usd} USD: {status}")
+        except Exception as e:
+            self.logger.error("Error placing batch of orders: %s", e, exc_info=True)
 
     def show_help(self):
         """Display help."""
@@ -175,9 +220,12 @@ class TradingCLI:
         print("load?                   - Show currently loaded real-time market streams.")
         print("unload ALL              - Unload ALL currently active real-time data streams.")
         print("markets [N]             - Show all available markets, or top N by 24h volume")
-        print("position [market]       - Show current position(s), optionally filtered by market")
+        print("position [m1 m2...]     - Show current position(s), optionally filtered by market(s)")
         print("<market> BB <amount>    - Place a BUY order at the best bid price (e.g., BTC BB 1000)")
         print("<market> BA <amount>    - Place a SELL order at the best ask price (e.g., ETH BA 500)")
+        print("batch begin             - Queue subsequent BB/BA orders instead of placing them immediately")
+        print("batch commit            - Place all queued orders at once")
+        print("batch cancel            - Discard all queued orders")
         print("close all               - Cancel all open orders.")
         print("exit                    - Exit the program")
         print("------------------")
@@ -190,23 +238,22 @@ class TradingCLI:
             return
         
         validated_markets_to_attempt_load = []
-        self.logger.info(f"[CLI] Validating markets for 'load' command: {markets_to_load}")
+        self.logger.info("[CLI] Validating markets for 'load' command: %s", markets_to_load)
+        # Refresh the market cache at most once, then validate every market against it in memory.
+        await self.market_utils.ensure_cache_fresh()
         for m_name_raw in markets_to_load:
-            m_upper = m_name_raw.upper()
-            normalized_m_name = m_upper
-            if not m_upper.endswith("-USD") and "-" not in m_upper:
-                normalized_m_name += "-USD"
+            normalized_m_name = _normalize_market(m_name_raw)
             
             try:
-                market_info = await self.market_utils.get_market_object(normalized_m_name)
+                market_info = self.market_utils.get_cached_market_object(normalized_m_name)
                 if market_info and hasattr(market_info, 'name') and market_info.name == normalized_m_name:
                     validated_markets_to_attempt_load.append(normalized_m_name)
-                    self.logger.debug(f"[CLI] Market {normalized_m_name} validated successfully.")
+                    self.logger.debug("[CLI] Market %s validated successfully.", normalized_m_name)
                 else:
-                    self.logger.warning(f"[CLI] Market {normalized_m_name} (raw: {m_name_raw}) not found or invalid according to MarketUtils.")
+                    self.logger.warning("[CLI] Market %s (raw: %s) not found or invalid according to MarketUtils.", normalized_m_name, m_name_raw)
                     print(f"Warning: Market \"{normalized_m_name}\" not recognized or is invalid. Stream will not be loaded.")
             except Exception as e:
-                self.logger.error(f"[CLI] Error validating market {normalized_m_name}: {e}", exc_info=True)
+                self.logger.error("[CLI] Error validating market %s: %s", normalized_m_name, e, exc_info=True)
                 print(f"Warning: Error validating market \"{normalized_m_name}\". Stream will not be loaded.")
 
         if not validated_markets_to_attempt_load:
@@ -214,7 +261,7 @@ class TradingCLI:
             print("No valid markets specified or found to load.")
             return
 
-        self.logger.info(f"[CLI] Requesting to load/start streams for validated markets: {validated_markets_to_attempt_load}")
+        self.logger.info("[CLI] Requesting to load/start streams for validated markets: %s", validated_markets_to_attempt_load)
         
         if self.realtime_provider_management_task and not self.realtime_provider_management_task.done():
             self.logger.warning("[CLI] Previous load/unload management task still running. Please wait.")
@@ -226,7 +273,7 @@ class TradingCLI:
             await self.realtime_provider_management_task
             print(f"Loading streams for: {', '.join(validated_markets_to_attempt_load)} initiated.") 
         except Exception as e:
-            self.logger.error(f"[CLI] Error during load command management task: {e}", exc_info=True)
+            self.logger.error("[CLI] Error during load command management task: %s", e, exc_info=True)
             print(f"Error encountered while trying to load streams for {', '.join(validated_markets_to_attempt_load)}.")
 
     async def handle_unload_command(self, markets_to_unload: List[str]):
@@ -242,7 +289,7 @@ class TradingCLI:
                 self.realtime_provider_management_task.cancel()
                 try: await self.realtime_provider_management_task
                 except asyncio.CancelledError: self.logger.info("[CLI] Management task cancelled before unload ALL.")
-                except Exception as e_task: self.logger.error(f"[CLI] Error cancelling management task before unload ALL: {e_task}")
+                except Exception as e_task: self.logger.error("[CLI] Error cancelling management task before unload ALL: %s", e_task)
         
         await self.realtime_data_provider.close_streams() 
         print("All real-time data streams have been requested to stop.")
@@ -272,7 +319,7 @@ class TradingCLI:
             # print(f"Cancellation response: {response.data}")
 
         except Exception as e:
-            self.logger.error(f"Error cancelling all orders: {str(e)}", exc_info=True)
+            self.logger.error("Error cancelling all orders: %s", e, exc_info=True)
             print(f"An error occurred while trying to cancel all orders: {str(e)}")
 
     async def process_command(self, command: str):
@@ -301,61 +348,112 @@ class TradingCLI:
             else:
                 await self.show_markets()
         elif cmd == "position":
-            market_arg = parts[1].upper() if len(parts) > 1 else None
-            if market_arg and not market_arg.endswith("-USD") and "-" not in market_arg:
-                 market_arg += "-USD"
-            await self.show_position(market_arg)
+            markets_arg = [_normalize_market(m) for m in parts[1:]] or None
+            await self.show_position(markets_arg)
         elif command.lower() == "close all":
             await self.handle_close_all_orders_command()
-        elif len(parts) == 3 and parts[1].upper() in ("BB", "BA"):
+        elif cmd == "batch" and len(parts) == 2 and parts[1].lower() in ("begin", "commit", "cancel"):
+            action = parts[1].lower()
+            if action == "begin":
+                if self._pending_orders is None:
+                    self._pending_orders = []
+                print("Batch started. BB/BA orders will be queued until 'batch commit'.")
+            elif self._pending_orders is None:
+                print("No batch in progress. Use 'batch begin' first.")
+            elif action == "commit":
+                orders, self._pending_orders = self._pending_orders, None
+                await self.execute_batch_orders(orders)
+            else:
+                print(f"Batch cancelled, {len(self._pending_orders)} queued order(s) discarded.")
+                self._pending_orders = None
+        elif len(parts) == 3 and (side := SIDES.get(parts[1].upper())):
             market = parts[0]
-            side = parts[1].upper()
             try:
                 amount_usd = float(parts[2])
-                await self.execute_best_order(market, side, amount_usd)
+                if self._pending_orders is not None:
+                    normalized_market_name = _normalize_market(market)
+                    self._pending_orders.append((normalized_market_name, side, amount_usd))
+                    print(f"Queued {normalized_market_name} {side} {amount_usd} USD ({len(self._pending_orders)} in batch).")
+                else:
+                    await self.execute_best_order(market, side, amount_usd)
             except ValueError as e:
                 print(f"Format error for amount: {str(e)}")
         else:
             print("Unknown command. Type 'help' to see available commands.")
 
+    def _start_input_reader(self) -> asyncio.Queue:
+        """Start a long-lived daemon thread that reads input lines into an asyncio.Queue (None on EOF)."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def read_lines():
+            while True:
+                # Only prompt once the command loop asks for the next line, so the prompt follows command output.
+                self._input_requested.wait()
+                self._input_requested.clear()
+                try:
+                    line = input("\n> ")
+                except EOFError:
+                    loop.call_soon_threadsafe(queue.put_nowait, None)
+                    return
+                loop.call_soon_threadsafe(queue.put_nowait, line)
+
+        threading.Thread(target=read_lines, name="cli-input-reader", daemon=True).start()
+        return queue
+
     async def run(self):
         """Run the interactive CLI."""
         print("Welcome to the Extended Exchange trading CLI!")
         # No automatic stream loading here anymore
         print("Type 'help' to see available commands or 'load <market(s)>' to start real-time data.")
+        await self.market_utils.start()
+        input_queue = self._start_input_reader()
 
-        while self.running:
-            try:
-                command = await asyncio.to_thread(input, "\n> ")
-                await self.process_command(command)
-            except KeyboardInterrupt:
-                print("\nProgram stopping by user request...")
-                self.running = False
-            except EOFError:
-                print("\nEOF received, stopping program...")
-                self.running = False
-            except Exception as e:
-                self.logger.error(f"Error in command processing: {str(e)}", exc_info=True)
-        
+        # The shared trading client (and its HTTP sessions) is closed however the loop ends, including on cancellation.
+        try:
+            while self.running:
+                try:
+                    self._input_requested.set()
+                    command = await input_queue.get()
+                    if command is None:
+                        print("\nEOF received, stopping program...")
+                        self.running = False
+                        continue
+                    await self.process_command(command)
+                except KeyboardInterrupt:
+                    print("\nProgram stopping by user request...")
+                    self.running = False
+                except Exception as e:
+                    self.logger.error("Error in command processing: %s", e, exc_info=True)
+        finally:
+            await self._cleanup()
+
+    async def _cleanup(self):
+        """Stop streams and background tasks, then close the trading client's connections."""
         self.logger.info("[CLI] Exiting program. Starting cleanup...")
         
-        if self.realtime_data_provider:
-             self.logger.info("[CLI] Ensuring all real-time data streams are stopped on exit...")
-             if self.realtime_provider_management_task and not self.realtime_provider_management_task.done():
-                self.logger.info("[CLI] Cancelling active load/unload management task due to exit...")
-                self.realtime_provider_management_task.cancel()
-                try: await self.realtime_provider_management_task
-                except asyncio.CancelledError: self.logger.info("[CLI] Management task cancelled on exit.")
-                except Exception as e_task: self.logger.error(f"[CLI] Error cancelling management task on exit: {e_task}")
-             
-             await self.realtime_data_provider.close_streams()
-
         try:
-            if self.trading_client:
-                await self.trading_client.close()
-                self.logger.info("[CLI] Trading client connection closed properly.")
+            if self.realtime_data_provider:
+                 self.logger.info("[CLI] Ensuring all real-time data streams are stopped on exit...")
+                 if self.realtime_provider_management_task and not self.realtime_provider_management_task.done():
+                    self.logger.info("[CLI] Cancelling active load/unload management task due to exit...")
+                    self.realtime_provider_management_task.cancel()
+                    try: await self.realtime_provider_management_task
+                    except asyncio.CancelledError: self.logger.info("[CLI] Management task cancelled on exit.")
+                    except Exception as e_task: self.logger.error("[CLI] Error cancelling management task on exit: %s", e_task)
+                 
+                 await self.realtime_data_provider.close_streams()
+
+            await self.market_utils.stop()
         except Exception as e:
-            self.logger.error(f"[CLI] Error during trading client cleanup: {str(e)}", exc_info=True)
+            self.logger.error("[CLI] Error stopping streams during cleanup: %s", e, exc_info=True)
+        finally:
+            try:
+                if self.trading_client:
+                    await self.trading_client.close()
+                    self.logger.info("[CLI] Trading client connection closed properly.")
+            except Exception as e:
+                self.logger.error("[CLI] Error during trading client cleanup: %s", e, exc_info=True)
         
         self.logger.info("[CLI] Cleanup finished. Goodbye!")
 
@@ -364,6 +462,8 @@ async def main():
     await cli.run()
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -371,4 +471,4 @@ if __name__ == "__main__":
         print("\nProgram interrupted externally. Exiting.")
     except Exception as e:
         # Catch-all for unexpected errors during startup/shutdown outside of the main CLI loop
-        logging.getLogger("main").error(f"Unhandled exception in main: {e}", exc_info=True) 
\ No newline at end of file
+        logging.getLogger("main").error("Unhandled exception in main: %s", e, exc_info=True) 
\ No newline at end of file
@@ -17,14 +17,14 @@ class AccountUtils:
         """Initialize with a trading client."""
         self.trading_client = trading_client
 
-    async def get_positions(self, market: Optional[str] = None) -> List[Dict]:
-        """Get current positions, optionally filtered by market."""
+    async def get_positions(self, markets: Optional[List[str]] = None) -> List[Dict]:
+        """Get current positions, optionally filtered by a list of markets, in a single request."""
         try:
-            if market:
-                positions = await self.trading_client.account.get_positions(market_names=[market])
+            if markets:
+                positions = await self.trading_client.account.get_positions(market_names=markets)
             else:
                 positions = await self.trading_client.account.get_positions()
             return positions.data
         except Exception as e:
-            logger.error(f"Error fetching positions: {str(e)}")
+            logger.error("Error fetching positions: %s", e)
             return []
@@ -1,6 +1,8 @@
+import asyncio
+import heapq
 import logging
 from decimal import Decimal
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, NamedTuple
 import time
 
 from x10.perpetual.accounts import StarkPerpetualAccount
@@ -13,6 +15,13 @@ logger = logging.getLogger(__name__)
 
 CACHE_DURATION_SECONDS = 60  
 
+class MarketRow(NamedTuple):
+    """A cached market with its last price and 24h volume already parsed to float."""
+    name: str
+    last_price: float
+    daily_volume: float
+    obj: Any
+
 class MarketUtils:
     """Utility class for market-related operations."""
 
@@ -20,67 +29,129 @@ class MarketUtils:
         """Initialize with a trading client."""
         self.trading_client = trading_client
         self._market_cache: Dict[str, Any] = {} 
-        self._cache_timestamps: Dict[str, float] = {} 
+        self._cache_last_refresh: float = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Set while a fetch is running so concurrent callers wait on it instead of starting their own.
+        self._refresh_inflight: Optional[asyncio.Future] = None
+        # Market rows with float stats, rebuilt once per cache refresh.
+        self._rows: Dict[str, MarketRow] = {}
+        self._active_rows: List[MarketRow] = []  # Rows with a positive 24h volume
+
+    async def start(self) -> None:
+        """Start the background task that keeps the market cache refreshed."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop the background cache refresh task."""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = None
+
+    async def _refresh_loop(self) -> None:
+        """Refetch all markets every CACHE_DURATION_SECONDS so lookups are served from memory."""
+        while True:
+            await self._fetch_and_cache_all_markets()
+            await asyncio.sleep(CACHE_DURATION_SECONDS)
 
     async def _fetch_and_cache_all_markets(self) -> None:
-        """Fetches all markets from the API and updates the cache."""
+        """Fetches all markets from the API and updates the cache. Concurrent callers share a single fetch."""
+        if self._refresh_inflight is not None:
+            logger.debug("[MarketUtils] Market fetch already in progress, waiting for it.")
+            await asyncio.shield(self._refresh_inflight)
+            return
+
+        self._refresh_inflight = asyncio.get_running_loop().create_future()
+        try:
+            await self._fetch_markets_into_cache()
+        finally:
+            self._refresh_inflight.set_result(None)
+            self._refresh_inflight = None
+
+    async def _fetch_markets_into_cache(self) -> None:
+        """Performs the actual markets API call and cache update."""
         try:
             logger.debug("[MarketUtils] Fetching all markets from API to update cache...")
             markets_response = await self.trading_client.markets_info.get_markets()
-            current_time = time.time()
             for m in markets_response.data:
                 self._market_cache[m.name] = m
-                self._cache_timestamps[m.name] = current_time
-            logger.debug(f"[MarketUtils] Market cache updated with {len(markets_response.data)} markets.")
+            self._rebuild_market_rows()
+            self._cache_last_refresh = time.time()
+            logger.debug("[MarketUtils] Market cache updated with %s markets.", len(markets_response.data))
         except Exception as e:
-            logger.error(f"[MarketUtils] Error fetching and caching all markets: {str(e)}")
+            logger.error("[MarketUtils] Error fetching and caching all markets: %s", e)
+
+    def _rebuild_market_rows(self) -> None:
+        """Validate and parse volume and last price of every cached market once, into one MarketRow per market."""
+        rows = {}
+        for name, m in self._market_cache.items():
+            # Missing stats become a zero volume / NaN price here, so no consumer needs attribute guards.
+            stats = getattr(m, 'market_stats', None)
+            try:
+                volume = float(getattr(stats, 'daily_volume', None) or 0)
+            except (ValueError, TypeError) as e:
+                logger.warning("Could not parse volume for market %s: %s", name, e)
+                volume = 0.0
+            try:
+                last_price = float(getattr(stats, 'last_price', None))
+            except (ValueError, TypeError):
+                last_price = float('nan')
+            rows[name] = MarketRow(name, last_price, volume, m)
+        self._rows = rows
+        self._active_rows = [r for r in rows.values() if r.daily_volume > 0]
+
+    @staticmethod
+    def _rows_by_volume(rows: Iterable[MarketRow], top_n: Optional[int] = None) -> List[MarketRow]:
+        """Sort market rows by 24h volume descending; with top_n, select only the largest top_n without a full sort."""
+        if top_n is None:
+            return sorted(rows, key=lambda r: r.daily_volume, reverse=True)
+        return heapq.nlargest(top_n, rows, key=lambda r: r.daily_volume)
+
+    async def ensure_cache_fresh(self) -> None:
+        """Refresh the market cache only if it is empty or older than CACHE_DURATION_SECONDS."""
+        if self._market_cache:
+            # While the background refresher runs it owns the TTL, so lookups never wait on the API.
+            if self._refresh_task is not None and not self._refresh_task.done():
+                return
+            if time.time() - self._cache_last_refresh < CACHE_DURATION_SECONDS:
+                return
+        logger.debug("[MarketUtils] ensure_cache_fresh: Cache empty or stale, refreshing.")
+        await self._fetch_and_cache_all_markets()
+
+    def get_cached_market_object(self, market_name: str) -> Optional[Any]:
+        """Return the market object for a market name from the in-memory cache, without any API call."""
+        return self._market_cache.get(market_name)
 
     async def get_market_object(self, market_name: str) -> Optional[Any]:
         """Get the full market object for a specific market name, using a cache."""
-        cached_market = self._market_cache.get(market_name)
-        cache_timestamp = self._cache_timestamps.get(market_name)
-
-        if cached_market and cache_timestamp and (time.time() - cache_timestamp < CACHE_DURATION_SECONDS):
-            logger.debug(f"[MarketUtils] Returning cached market object for {market_name}.")
-            return cached_market
-        
-        logger.debug(f"[MarketUtils] No valid cache for {market_name} or cache expired. Fetching from API.")
-        await self._fetch_and_cache_all_markets() 
-        
+        await self.ensure_cache_fresh()
 
         final_market = self._market_cache.get(market_name)
         if not final_market:
-             logger.warning(f"[MarketUtils] Market object for {market_name} not found even after cache refresh.")
+             logger.warning("[MarketUtils] Market object for %s not found in market cache.", market_name)
         return final_market
 
     async def get_markets(self, top_n: Optional[int] = None) -> List[Any]:
         """Get all available markets, using cache and optionally sorting by 24h volume."""
-        needs_refresh = True
-        if self._market_cache and self._cache_timestamps:
-            if not any(time.time() - ts < CACHE_DURATION_SECONDS for ts in self._cache_timestamps.values()):
-                logger.debug("[MarketUtils] get_markets: Cache seems entirely stale or empty, attempting refresh.")
-                await self._fetch_and_cache_all_markets()
-            elif not self._market_cache: # If cache is empty
-                 logger.debug("[MarketUtils] get_markets: Cache empty, attempting refresh.")
-                 await self._fetch_and_cache_all_markets()
+        await self.ensure_cache_fresh()
 
         markets_list = list(self._market_cache.values())
         
-        if not markets_list and not self._market_cache: 
+        if not markets_list: 
             logger.warning("[MarketUtils] get_markets: No markets available even after attempting cache refresh.")
             return []
         
         if top_n is not None:
-            markets_list_to_sort = []
-            for m in markets_list:
-                try:
-                    volume = float(m.market_stats.daily_volume)
-                    markets_list_to_sort.append((m, volume))
-                except (AttributeError, ValueError, TypeError) as e:
-                    logger.warning(f"Could not parse volume for market {getattr(m, 'name', 'Unknown')} while sorting: {e}")
-            
-            markets_list_to_sort.sort(key=lambda item: item[1], reverse=True)
-            return [item[0] for item in markets_list_to_sort[:top_n]]
+            return [r.obj for r in self._rows_by_volume(self._rows.values(), top_n)]
         
         return markets_list
 
+    async def get_market_rows(self, top_n: Optional[int] = None) -> List[MarketRow]:
+        """Get rows for markets with a positive 24h volume, sorted by volume descending and optionally limited to top_n."""
+        await self.ensure_cache_fresh()
+        return self._rows_by_volume(self._active_rows, top_n)
+
@@ -1,166 +1,323 @@
 import asyncio
 import json
 import logging
+import random
+import sys
 import time
 import websockets
-from typing import Dict, Optional, Any, List
+from decimal import Decimal
+from typing import Dict, Optional, List, NamedTuple, Tuple
+
+try:
+    # orjson parses the snapshot stream several times faster than the stdlib; it is optional.
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of WebSocket handshakes in flight at once; each market keeps its own connection once established.
+MAX_CONCURRENT_CONNECTS = 4
+
+# Reconnect backoff per market: doubles from the base delay up to the cap, plus random jitter so that markets
+# dropped together do not all reconnect at the same moment.
+RECONNECT_BASE_DELAY_SECONDS = 10
+RECONNECT_MAX_DELAY_SECONDS = 60
+RECONNECT_JITTER_SECONDS = 5
+
+# "type" of order book snapshot messages. Every snapshot frame contains it as a quoted literal, and the stream sends
+# JSON text frames, so a substring test on the raw message is enough to skip other frames. The whole (small) frame
+# is searched, as JSON key order is not guaranteed.
+SNAPSHOT_TYPE = "SNAPSHOT"
+SNAPSHOT_MARKER = '"' + SNAPSHOT_TYPE + '"'
+
+# depth=1 snapshots are well under 1 KiB: permessage-deflate would only add a zlib inflate per message, and the
+# default 1 MiB frame limit is far larger than needed (a frame above max_size closes the connection with code 1009
+# and the listener reconnects). A short max_queue stops reading from the socket once a few frames are waiting, so a
+# burst backs up in TCP instead of in memory. Keepalive settings are pinned explicitly rather than left to defaults.
+WEBSOCKET_CONNECT_OPTIONS = {
+    "compression": None,
+    "max_size": 2 ** 14,
+    "max_queue": 8,
+    "ping_interval": 20,
+    "ping_timeout": 20,
+}
+
+class Snapshot(NamedTuple):
+    """Latest top of book for one market, as the raw price/quantity strings from the stream."""
+    bid_price: str
+    bid_qty: str
+    ask_price: str
+    ask_qty: str
+    timestamp: float
+
+# Stream key of the single multiplexed connection, used in place of a market name in the per-stream dicts.
+ALL_MARKETS_STREAM = "*"
+
 class RealTimeMarketDataProvider:
     """
     Manages WebSocket connections to receive real-time top-of-book market data (best bid/ask).
     Stores only the latest snapshot for each market.
+
+    By default each market gets its own connection. With multiplex=True a single connection to the all-markets
+    stream is used instead, and snapshots are dispatched to active markets by the market name in each message.
     """
     WEBSOCKET_URL_TEMPLATE = "wss://api.extended.exchange/stream.extended.exchange/v1/orderbooks/{market}?depth=1"
-    # If you want to subscribe to all markets with depth=1, the URL might be:
-    # WEBSOCKET_URL_ALL_MARKETS = "wss://api.extended.exchange/stream.extended.exchange/v1/orderbooks?depth=1"
-    # However, processing messages for "all" markets requires parsing the market from each message.
-    # For simplicity, we'll initially connect to specified markets individually.
+    WEBSOCKET_URL_ALL_MARKETS = "wss://api.extended.exchange/stream.extended.exchange/v1/orderbooks?depth=1"
 
-    def __init__(self):
-        self._latest_market_data: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, multiplex: bool = False):
+        self._multiplex = multiplex
+        # Latest immutable Snapshot per market, replaced wholesale on every tick.
+        self._latest_market_data: Dict[str, Snapshot] = {}
+        # Last (bid_str, bid, ask_str, ask) handed out per market, so unchanged prices are not re-parsed.
+        self._decimal_cache: Dict[str, Tuple[str, Decimal, str, Decimal]] = {}
         self._market_connections: Dict[str, websockets.WebSocketClientProtocol] = {}
         self._connection_tasks: Dict[str, asyncio.Task] = {}
         self._running = False
+        # Holds only the markets currently marked active (stopped markets are removed), so the multiplexed listener can
+        # test its per-frame "any market active" condition with a single truth test.
         self._active_market_listeners: Dict[str, bool] = {}
-        self._lock = asyncio.Lock()
+        # No lock guards the state above: it is only touched from the event loop and no update of it spans an await,
+        # so readers (including get_best_bid_ask) never observe a partial start, stop or teardown.
+        self._connect_semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONNECTS)
+        self._backoff: Dict[str, float] = {}
+        # Per-market single-slot queues fed with every published snapshot; an unread snapshot is replaced (latest wins).
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        # Caller-supplied market name -> interned uppercase name, so hot lookups skip str.upper().
+        self._canonical: Dict[str, str] = {}
+
+    def _canonical_name(self, market_name: str) -> str:
+        """Returns the interned uppercase form of a market name, computing it once per distinct spelling."""
+        canonical = self._canonical.get(market_name)
+        if canonical is None:
+            canonical = self._canonical[market_name] = sys.intern(market_name.upper())
+        return canonical
+
+    def _is_stream_active(self, stream_key: str) -> bool:
+        """Whether a stream should keep running: its market is active, or (multiplexed) any market is."""
+        if not self._running:
+            return False
+        if stream_key == ALL_MARKETS_STREAM:
+            return bool(self._active_market_listeners)
+        return self._active_market_listeners.get(stream_key, False)
 
     async def _listen_to_market_stream(self, market_name: str):
         """Continuously listens to the WebSocket stream for a single market if active."""
-        url = self.WEBSOCKET_URL_TEMPLATE.format(market=market_name)
-        while self._running and self._active_market_listeners.get(market_name, False):
-            logger.info(f"[RealTimeDataProvider] Attempting to connect or re-connect to WebSocket for {market_name} at {url}")
-            try:
-                async with websockets.connect(url) as websocket:
-                    self._market_connections[market_name] = websocket
-                    logger.info(f"[RealTimeDataProvider] Successfully connected to {market_name} stream.")
-                    
-                    while self._running and self._active_market_listeners.get(market_name, False):
-                        try:
-                            message_str = await websocket.recv()
-                            snapshot = json.loads(message_str)
+        await self._run_stream(market_name, self.WEBSOCKET_URL_TEMPLATE.format(market=market_name))
+
+    async def _multiplexed_listener(self):
+        """Continuously listens to the all-markets stream, publishing snapshots for every active market."""
+        await self._run_stream(ALL_MARKETS_STREAM, self.WEBSOCKET_URL_ALL_MARKETS)
+
+    async def _run_stream(self, stream_key: str, url: str):
+        """Connects to one stream and publishes its snapshots while it is active, reconnecting with backoff."""
+        multiplexed = stream_key == ALL_MARKETS_STREAM
+        # The cleanup runs in a finally: stop_specific_streams and close_streams end listeners by cancelling them,
+        # and the CancelledError would otherwise skip it and leave a grown backoff for the next start.
+        try:
+            while self._is_stream_active(stream_key):
+                logger.info("[RealTimeDataProvider] Attempting to connect or re-connect to WebSocket for %s at %s", stream_key, url)
+                try:
+                    async with self._connect_semaphore:
+                        websocket = await websockets.connect(url, **WEBSOCKET_CONNECT_OPTIONS)
+                    try:
+                        self._market_connections[stream_key] = websocket
+                        logger.info("[RealTimeDataProvider] Successfully connected to %s stream.", stream_key)
+                        self._backoff.pop(stream_key, None)
+
+                        # Per-message lookups are bound to locals once per connection. The dicts are only ever
+                        # cleared in place, never replaced, so the bindings stay valid.
+                        recv = websocket.recv
+                        buffered = websocket.messages
+                        loads = _json_loads
+                        is_active = self._is_stream_active
+                        active = self._active_market_listeners
+                        latest = self._latest_market_data
+                        subscribers = self._subscribers
+
+                        while is_active(stream_key):
+                            try:
+                                message_str = await recv()
+                                if not multiplexed:
+                                    # Frames already buffered behind this one are newer snapshots of the same market, so
+                                    # only the freshest is parsed. recv() returns at once while websocket.messages is non-empty.
+                                    while buffered:
+                                        newer_str = await recv()
+                                        if SNAPSHOT_MARKER in newer_str:
+                                            message_str = newer_str
+                                # Heartbeats and other non-snapshot frames are dropped without being parsed.
+                                if SNAPSHOT_MARKER not in message_str:
+                                    continue
+                                snapshot = loads(message_str)
                             
-                            if snapshot.get("type") == "SNAPSHOT" and snapshot.get("data", {}).get("m") == market_name:
-                                data = snapshot["data"]
-                                best_bid = data.get("b", [{}])[0]
-                                best_ask = data.get("a", [{}])[0]
-
-                                if best_bid.get("p") and best_ask.get("p"):
-                                    async with self._lock:
-                                        if self._active_market_listeners.get(market_name):
-                                            self._latest_market_data[market_name] = {
-                                                "bid_price": best_bid["p"],
-                                                "bid_qty": best_bid.get("q", "0"),
-                                                "ask_price": best_ask["p"],
-                                                "ask_qty": best_ask.get("q", "0"),
-                                                "timestamp": snapshot.get("ts", time.time() * 1000)
-                                            }
-                                else:
-                                    logger.warning(f"[RealTimeDataProvider] Snapshot for {market_name} lacked bid/ask price: {snapshot}")
-
-                        except websockets.exceptions.ConnectionClosed as e:
-                            logger.warning(f"[RealTimeDataProvider] Connection for {market_name} closed: {e}. Will attempt to reconnect if still active.")
-                            break
-                        except json.JSONDecodeError as e:
-                            logger.error(f"[RealTimeDataProvider] Error decoding JSON for {market_name}: {message_str} - Error: {e}")
-                        except Exception as e:
-                            logger.error(f"[RealTimeDataProvider] Error in {market_name} stream listener: {e}", exc_info=True)
-                            await asyncio.sleep(5)
-                            break
-            
-            except (websockets.exceptions.InvalidURI, ConnectionRefusedError, websockets.exceptions.WebSocketException) as e:
-                logger.error(f"[RealTimeDataProvider] WebSocket connection error for {market_name} ({url}): {e}. Retrying in 10s if still active.")
-            except Exception as e:
-                 logger.error(f"[RealTimeDataProvider] Unexpected error connecting to {market_name} ({url}): {e}. Retrying in 10s if still active.", exc_info=True)
+                                if snapshot.get("type") == SNAPSHOT_TYPE:
+                                    data = snapshot.get("data", {})
+                                    # A per-market stream only carries its own market; only the all-markets stream needs
+                                    # the name from the message.
+                                    market_name = data.get("m") if multiplexed else stream_key
+                                    if not active.get(market_name):
+                                        continue
+                                    bid_levels = data.get("b")
+                                    ask_levels = data.get("a")
+                                    best_bid = bid_levels[0] if bid_levels else None
+                                    best_ask = ask_levels[0] if ask_levels else None
+                                    bid_price = best_bid.get("p") if best_bid else None
+                                    ask_price = best_ask.get("p") if best_ask else None
 
-            if self._running and self._active_market_listeners.get(market_name, False):
-                await asyncio.sleep(10)
-            else:
-                logger.info(f"[RealTimeDataProvider] Listener for {market_name} stopping as it's no longer marked active or provider is shutting down.")
-                break
+                                    if bid_price and ask_price:
+                                        # No lock: publishing is a single dict assignment of an immutable snapshot.
+                                        snap = latest[market_name] = Snapshot(
+                                            bid_price,
+                                            best_bid.get("q", "0"),
+                                            ask_price,
+                                            best_ask.get("q", "0"),
+                                            snapshot.get("ts", time.time() * 1000),
+                                        )
+                                        queues = subscribers.get(market_name)
+                                        if queues:
+                                            for queue in queues:
+                                                if queue.full():
+                                                    queue.get_nowait()
+                                                queue.put_nowait(snap)
+                                    else:
+                                        logger.warning("[RealTimeDataProvider] Snapshot for %s lacked bid/ask price: %s", market_name, snapshot)
+
+                            except websockets.exceptions.ConnectionClosed as e:
+                                logger.warning("[RealTimeDataProvider] Connection for %s closed: %s. Will attempt to reconnect if still active.", stream_key, e)
+                                break
+                            except json.JSONDecodeError as e:
+                                logger.error("[RealTimeDataProvider] Error decoding JSON for %s: %s - Error: %s", stream_key, message_str, e)
+                            except Exception as e:
+                                logger.error("[RealTimeDataProvider] Error in %s stream listener: %s", stream_key, e, exc_info=True)
+                                await asyncio.sleep(5)
+                                break
+                    finally:
+                        await websocket.close()
+            
+                except (websockets.exceptions.InvalidURI, ConnectionRefusedError, websockets.exceptions.WebSocketException) as e:
+                    logger.error("[RealTimeDataProvider] WebSocket connection error for %s (%s): %s. Retrying with backoff if still active.", stream_key, url, e)
+                except Exception as e:
+                     logger.error("[RealTimeDataProvider] Unexpected error connecting to %s (%s): %s. Retrying with backoff if still active.", stream_key, url, e, exc_info=True)
 
-        logger.info(f"[RealTimeDataProvider] Listener task for {market_name} fully stopped.")
-        async with self._lock:
-            if market_name in self._market_connections:
-                del self._market_connections[market_name]
-            if market_name in self._latest_market_data:
-                del self._latest_market_data[market_name]
+                if self._is_stream_active(stream_key):
+                    delay = self._backoff.get(stream_key, RECONNECT_BASE_DELAY_SECONDS)
+                    self._backoff[stream_key] = min(delay * 2, RECONNECT_MAX_DELAY_SECONDS)
+                    await asyncio.sleep(delay + random.uniform(0, RECONNECT_JITTER_SECONDS))
+                else:
+                    logger.info("[RealTimeDataProvider] Listener for %s stopping as it's no longer marked active or provider is shutting down.", stream_key)
+                    break
+        finally:
+            logger.info("[RealTimeDataProvider] Listener task for %s fully stopped.", stream_key)
+            self._backoff.pop(stream_key, None)
+            self._market_connections.pop(stream_key, None)
+            self._latest_market_data.pop(stream_key, None)
+            self._decimal_cache.pop(stream_key, None)
 
     async def start_streams(self, markets: List[str]):
         """Starts or ensures listening to WebSocket streams for the given list of markets."""
         self._running = True
         markets_started_or_restarted = []
         for market_name_raw in markets:
-            market_name = market_name_raw.upper()
+            market_name = self._canonical_name(market_name_raw)
             self._active_market_listeners[market_name] = True
             
-            if market_name not in self._connection_tasks or self._connection_tasks[market_name].done():
-                logger.info(f"[RealTimeDataProvider] Creating new listener task for {market_name}.")
-                task = asyncio.create_task(self._listen_to_market_stream(market_name))
-                self._connection_tasks[market_name] = task
+            # In multiplex mode every market is served by the one all-markets listener task.
+            stream_key = ALL_MARKETS_STREAM if self._multiplex else market_name
+            if stream_key not in self._connection_tasks or self._connection_tasks[stream_key].done():
+                logger.info("[RealTimeDataProvider] Creating new listener task for %s.", stream_key)
+                if self._multiplex:
+                    task = asyncio.create_task(self._multiplexed_listener())
+                else:
+                    task = asyncio.create_task(self._listen_to_market_stream(market_name))
+                self._connection_tasks[stream_key] = task
                 markets_started_or_restarted.append(market_name)
             else:
-                logger.info(f"[RealTimeDataProvider] Listener task for {market_name} already exists and is active. Ensuring it continues.")
+                logger.info("[RealTimeDataProvider] Listener task for %s already exists and is active. Ensuring it continues.", stream_key)
 
         if markets_started_or_restarted:
-            logger.info(f"[RealTimeDataProvider] Started/Restarted listener tasks for: {markets_started_or_restarted}")
+            logger.info("[RealTimeDataProvider] Started/Restarted listener tasks for: %s", markets_started_or_restarted)
         else:
-            logger.info(f"[RealTimeDataProvider] All requested markets {markets} listeners were already active or being managed.")
+            logger.info("[RealTimeDataProvider] All requested markets %s listeners were already active or being managed.", markets)
 
     async def stop_specific_streams(self, markets_to_stop: List[str]):
         """Stops listening to WebSocket streams for the specified markets."""
-        logger.info(f"[RealTimeDataProvider] Attempting to stop streams for: {markets_to_stop}")
-        stopped_market_tasks = []
+        logger.info("[RealTimeDataProvider] Attempting to stop streams for: %s", markets_to_stop)
+        stopped_tasks: List[Tuple[str, asyncio.Task]] = []
+        stream_keys_to_stop: List[str] = []
 
         for market_name_raw in markets_to_stop:
-            market_name = market_name_raw.upper()
-            self._active_market_listeners[market_name] = False
-            
-            task = self._connection_tasks.get(market_name)
+            market_name = self._canonical_name(market_name_raw)
+            self._active_market_listeners.pop(market_name, None)
+            if not self._multiplex:
+                stream_keys_to_stop.append(market_name)
+
+            if self._latest_market_data.pop(market_name, None) is not None:
+                logger.debug("[RealTimeDataProvider] Cleared latest data for stopped market %s.", market_name)
+            self._decimal_cache.pop(market_name, None)
+
+        # The shared multiplexed connection is only torn down once no market needs it any more.
+        if self._multiplex and not self._active_market_listeners:
+            stream_keys_to_stop.append(ALL_MARKETS_STREAM)
+
+        for stream_key in stream_keys_to_stop:
+            task = self._connection_tasks.get(stream_key)
             if task and not task.done():
-                logger.info(f"[RealTimeDataProvider] Cancelling listener task for {market_name}.")
+                logger.info("[RealTimeDataProvider] Cancelling listener task for %s.", stream_key)
                 task.cancel()
-                stopped_market_tasks.append(task)
+                stopped_tasks.append((stream_key, task))
             else:
-                logger.info(f"[RealTimeDataProvider] No active listener task found for {market_name} to stop, or already done.")
+                logger.info("[RealTimeDataProvider] No active listener task found for %s to stop, or already done.", stream_key)
             
-            conn = self._market_connections.get(market_name)
+            conn = self._market_connections.get(stream_key)
             if conn and not conn.closed:
                 try:
-                    logger.info(f"[RealTimeDataProvider] Explicitly closing WebSocket for {market_name}.")
+                    logger.info("[RealTimeDataProvider] Explicitly closing WebSocket for %s.", stream_key)
                     await conn.close()
                 except Exception as e:
-                    logger.error(f"[RealTimeDataProvider] Error explicitly closing WebSocket for {market_name}: {e}")
-
-            async with self._lock:
-                if market_name in self._latest_market_data:
-                    logger.debug(f"[RealTimeDataProvider] Clearing latest data for stopped market {market_name}.")
-                    del self._latest_market_data[market_name]
-                if market_name in self._market_connections:
-                    del self._market_connections[market_name]
-
-        if stopped_market_tasks:
-            results = await asyncio.gather(*stopped_market_tasks, return_exceptions=True)
-            for market_raw, result in zip(markets_to_stop, results):
-                market = market_raw.upper()
-                if isinstance(result, asyncio.CancelledError):
-                    logger.info(f"[RealTimeDataProvider] Listener task for {market} was cancelled successfully.")
-                elif isinstance(result, Exception):
-                    logger.error(f"[RealTimeDataProvider] Exception during task cancellation for {market}: {result}")
-                if market in self._connection_tasks:
-                    del self._connection_tasks[market]
+                    logger.error("[RealTimeDataProvider] Error explicitly closing WebSocket for %s: %s", stream_key, e)
+
+            self._market_connections.pop(stream_key, None)
+
+        await self._await_cancelled(stopped_tasks)
+        for stream_key, _ in stopped_tasks:
+            self._connection_tasks.pop(stream_key, None)
         
-        if not any(self._active_market_listeners.values()):
+        if not self._active_market_listeners:
             logger.info("[RealTimeDataProvider] All specific streams stopped, and no other streams are active. Setting provider to inactive.")
 
-        logger.info(f"[RealTimeDataProvider] Finished stopping streams for: {markets_to_stop}")
+        logger.info("[RealTimeDataProvider] Finished stopping streams for: %s", markets_to_stop)
+
+    @staticmethod
+    async def _await_cancelled(tasks: List[Tuple[str, asyncio.Task]]):
+        """Waits for already-cancelled (stream key, task) pairs to finish in one gather, logging each outcome."""
+        if not tasks:
+            return
+        results = await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+        for (stream_key, _), result in zip(tasks, results):
+            if isinstance(result, asyncio.CancelledError):
+                logger.info("[RealTimeDataProvider] Listener task for %s was cancelled successfully.", stream_key)
+            elif isinstance(result, Exception):
+                logger.error("[RealTimeDataProvider] Exception during task cancellation for %s: %s", stream_key, result)
+
+    def get_best_bid_ask(self, market_name: str) -> Optional[Snapshot]:
+        """Returns the latest best bid and ask snapshot for the given market."""
+        return self._latest_market_data.get(self._canonical_name(market_name))
 
-    async def get_best_bid_ask(self, market_name: str) -> Optional[Dict[str, Any]]:
-        """Returns the latest best bid and ask for the given market."""
-        market_name = market_name.upper()
-        async with self._lock:
-            return self._latest_market_data.get(market_name)
+    def get_best_bid_ask_decimal(self, market_name: str) -> Optional[Tuple[Decimal, Decimal]]:
+        """Returns the latest (best bid, best ask) prices as Decimals for the given market."""
+        market_name = self._canonical_name(market_name)
+        snap = self._latest_market_data.get(market_name)
+        if snap is None:
+            return None
+        bid_str, ask_str = snap.bid_price, snap.ask_price
+        cached = self._decimal_cache.get(market_name)
+        if cached is not None and cached[0] == bid_str and cached[2] == ask_str:
+            return cached[1], cached[3]
+        bid = cached[1] if cached is not None and cached[0] == bid_str else Decimal(bid_str)
+        ask = cached[3] if cached is not None and cached[2] == ask_str else Decimal(ask_str)
+        self._decimal_cache[market_name] = (bid_str, bid, ask_str, ask)
+        return bid, ask
 
     async def close_streams(self):
         """Stops all listening tasks and closes WebSocket connections. Full shutdown of provider."""
@@ -168,30 +325,49 @@ class RealTimeMarketDataProvider:
         self._running = False
         self._active_market_listeners.clear()
 
-        tasks_to_wait_for = []
+        tasks_to_wait_for: List[Tuple[str, asyncio.Task]] = []
         for market_name, task in list(self._connection_tasks.items()):
             if task and not task.done():
-                logger.info(f"[RealTimeDataProvider] Cancelling task for market {market_name} during full shutdown.")
+                logger.info("[RealTimeDataProvider] Cancelling task for market %s during full shutdown.", market_name)
                 task.cancel()
-                tasks_to_wait_for.append(task)
+                tasks_to_wait_for.append((market_name, task))
         
-        if tasks_to_wait_for:
-            results = await asyncio.gather(*tasks_to_wait_for, return_exceptions=True)
+        await self._await_cancelled(tasks_to_wait_for)
 
         for market_name, ws in list(self._market_connections.items()):
             try:
                 if ws and not ws.closed:
-                    logger.info(f"[RealTimeDataProvider] Closing WebSocket connection for {market_name} during full shutdown.")
+                    logger.info("[RealTimeDataProvider] Closing WebSocket connection for %s during full shutdown.", market_name)
                     await ws.close()
             except Exception as e:
-                logger.error(f"[RealTimeDataProvider] Error closing WebSocket for {market_name} during full shutdown: {e}")
+                logger.error("[RealTimeDataProvider] Error closing WebSocket for %s during full shutdown: %s", market_name, e)
         
         self._market_connections.clear()
         self._connection_tasks.clear()
-        async with self._lock:
-            self._latest_market_data.clear()
+        self._latest_market_data.clear()
+        self._decimal_cache.clear()
+        self._backoff.clear()
         logger.info("[RealTimeDataProvider] All streams, connections, and data cleared for full shutdown.")
 
+    def subscribe(self, market_name: str) -> asyncio.Queue:
+        """Returns a single-slot queue that receives each new snapshot for the market, replacing any unread one."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.setdefault(self._canonical_name(market_name), []).append(queue)
+        return queue
+
+    def unsubscribe(self, market_name: str, queue: asyncio.Queue):
+        """Stops delivering snapshots to a queue returned by subscribe()."""
+        market_name = self._canonical_name(market_name)
+        queues = self._subscribers.get(market_name)
+        if queues and queue in queues:
+            queues.remove(queue)
+            if not queues:
+                del self._subscribers[market_name]
+
+    def is_stream_active(self, market_name: str) -> bool:
+        """Returns whether a stream is currently marked as active for the market."""
+        return self._active_market_listeners.get(self._canonical_name(market_name), False)
+
     def get_active_streams(self) -> List[str]:
         """Returns a list of market names for which streams are currently marked as active."""
         # Ensure this is thread-safe if accessed concurrently, though current CLI usage is serial for commands.
@@ -252,4 +428,9 @@ if __name__ == "__main__":
     # To run this test: python -m CLI.core.realtime_market_data 
     # (assuming you are in the directory above CLI)
     # Or adjust python path if running directly.
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(main_test()) 
\ No newline at end of file
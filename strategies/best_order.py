@@ -1,6 +1,8 @@
+import asyncio
 import logging
+import time
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, List, Tuple, Dict
 from x10.perpetual.orders import OrderSide
 from x10.perpetual.trading_client import PerpetualTradingClient
 
@@ -16,62 +18,119 @@ class APIMessageFilter(logging.Filter):
 logger = logging.getLogger(__name__)
 logger.addFilter(APIMessageFilter())
 
+# Accepted side tags -> (API order side, index of the price to join in (bid, ask), label for logs).
+_ORDER_SIDES = {
+    "bb": (OrderSide.BUY, 0, 'bid'),
+    "buy": (OrderSide.BUY, 0, 'bid'),
+    "ba": (OrderSide.SELL, 1, 'ask'),
+    "sell": (OrderSide.SELL, 1, 'ask'),
+}
+
+# How long an order waits for the first snapshot of a market whose stream was started but has not delivered yet.
+FIRST_SNAPSHOT_TIMEOUT_SECONDS = 2.0
+
+# How long a market's order size limits are reused before the market config is looked up again.
+MARKET_CONFIG_TTL_SECONDS = 300
+
 class BestOrderStrategy(BaseStrategy):
     """Strategy for placing orders at the best bid or ask price using real-time WebSocket data for price."""
 
     def __init__(self, trading_client: PerpetualTradingClient, market_utils: MarketUtils, realtime_data_provider: RealTimeMarketDataProvider):
         super().__init__(trading_client=trading_client, market_utils=market_utils)
         self.realtime_data_provider = realtime_data_provider
+        # market -> (fetched at, min_order_size, min_order_size_change), with the limits already parsed to Decimal.
+        self._mc_cache: Dict[str, Tuple[float, Decimal, Decimal]] = {}
 
     async def execute(self, market: str, side: str, amount_usd: float):
         """Execute the best order strategy using real-time WebSocket for price and REST API for market config."""
         try:
-            market_config = await self.get_market_info(market)
-            if not market_config or not hasattr(market_config, 'trading_config'):
-                logger.error(f"[BestOrderStrategy] Market trading configuration for {market} not found via MarketUtils.")
+            order_limits = await self._get_order_limits(market)
+        except Exception as e:
+            logger.error("[BestOrderStrategy] Error fetching market configuration for %s: %s", market, e, exc_info=True)
+            return None
+        return await self._place_best_order(market, side, amount_usd, order_limits)
+
+    async def execute_batch(self, orders: List[Tuple[str, str, float]]) -> List[Optional[str]]:
+        """Place several (market, side, amount_usd) orders in one go. Returns the order ID (or None) for each order, by index."""
+        # Order limits are looked up once per market, however many legs target it.
+        market_limits: Dict[str, Optional[Tuple[Decimal, Decimal]]] = {}
+        for market, _, _ in orders:
+            if market not in market_limits:
+                try:
+                    market_limits[market] = await self._get_order_limits(market)
+                except Exception as e:
+                    logger.error("[BestOrderStrategy] Error fetching market configuration for %s: %s", market, e, exc_info=True)
+                    market_limits[market] = None
+
+        results = await asyncio.gather(
+            *(self._place_best_order(market, side, amount_usd, market_limits[market]) for market, side, amount_usd in orders),
+            return_exceptions=True
+        )
+        return [None if isinstance(result, BaseException) else result for result in results]
+
+    async def _get_order_limits(self, market: str) -> Optional[Tuple[Decimal, Decimal]]:
+        """Returns the market's (min_order_size, min_order_size_change), cached for MARKET_CONFIG_TTL_SECONDS."""
+        now = time.monotonic()
+        cached = self._mc_cache.get(market)
+        if cached is not None and now - cached[0] < MARKET_CONFIG_TTL_SECONDS:
+            return cached[1], cached[2]
+
+        market_config = await self.get_market_info(market)
+        if not market_config or not hasattr(market_config, 'trading_config'):
+            return None
+        trading_config = market_config.trading_config
+        min_order_size = Decimal(str(trading_config.min_order_size))
+        min_order_size_change = Decimal(str(trading_config.min_order_size_change))
+        self._mc_cache[market] = (now, min_order_size, min_order_size_change)
+        return min_order_size, min_order_size_change
+
+    async def _wait_for_first_snapshot(self, market: str) -> Optional[Tuple[Decimal, Decimal]]:
+        """Waits briefly for a just-loaded market's first snapshot, then returns its (bid, ask) as Decimals."""
+        queue = self.realtime_data_provider.subscribe(market)
+        try:
+            await asyncio.wait_for(queue.get(), FIRST_SNAPSHOT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.realtime_data_provider.unsubscribe(market, queue)
+        return self.realtime_data_provider.get_best_bid_ask_decimal(market)
+
+    async def _place_best_order(self, market: str, side: str, amount_usd: float, order_limits: Optional[Tuple[Decimal, Decimal]]):
+        """Price and place a single post-only order at the best bid/ask, given the market's (min size, size step)."""
+        try:
+            if not order_limits:
+                logger.error("[BestOrderStrategy] Market trading configuration for %s not found via MarketUtils.", market)
                 return None
+            min_order_size, min_order_size_change = order_limits
 
-            # Get real-time best bid/ask from RealTimeMarketDataProvider
-            realtime_prices = await self.realtime_data_provider.get_best_bid_ask(market)
-            if not realtime_prices:
-                logger.error(f"[BestOrderStrategy] Real-time price data not available for {market} from RealTimeMarketDataProvider.")
+            # Resolve the side once: the API order side and which top-of-book price it joins.
+            side_spec = _ORDER_SIDES.get(side.lower())
+            if side_spec is None:
+                logger.error("[BestOrderStrategy] Invalid side: %s for market %s", side, market)
                 return None
+            order_side_api, price_index, price_label = side_spec
 
-            price: Optional[Decimal] = None
-            if side.lower() in ("bb", "buy"):
-                if realtime_prices.get('bid_price'):
-                    price = Decimal(str(realtime_prices['bid_price']))
-                    logger.debug(f"[BestOrderStrategy] Using WebSocket real-time bid price: {price} for {market} {side}")
-                else:
-                    logger.error(f"[BestOrderStrategy] Real-time bid price not available for {market}.")
-                    return None
-            elif side.lower() in ("ba", "sell"):
-                if realtime_prices.get('ask_price'):
-                    price = Decimal(str(realtime_prices['ask_price']))
-                    logger.debug(f"[BestOrderStrategy] Using WebSocket real-time ask price: {price} for {market} {side}")
-                else:
-                    logger.error(f"[BestOrderStrategy] Real-time ask price not available for {market}.")
-                    return None
-            else:
-                logger.error(f"[BestOrderStrategy] Invalid side: {side} for market {market}")
+            # Get real-time best bid/ask from RealTimeMarketDataProvider, already converted to Decimal
+            realtime_prices = self.realtime_data_provider.get_best_bid_ask_decimal(market)
+            if not realtime_prices and self.realtime_data_provider.is_stream_active(market):
+                realtime_prices = await self._wait_for_first_snapshot(market)
+            if not realtime_prices:
+                logger.error("[BestOrderStrategy] Real-time price data not available for %s from RealTimeMarketDataProvider.", market)
                 return None
 
-            if price is None: 
-                logger.error(f"[BestOrderStrategy] Could not determine real-time price for {market} {side}. Order aborted.")
+            price = realtime_prices[price_index]
+            if not price:
+                logger.error("[BestOrderStrategy] Real-time %s price not available for %s.", price_label, market)
                 return None
-            
-            order_side_api = OrderSide.BUY if side.lower() in ("bb", "buy") else OrderSide.SELL
+            logger.debug("[BestOrderStrategy] Using WebSocket real-time %s price: %s for %s %s", price_label, price, market, side)
 
-            min_order_size = Decimal(str(market_config.trading_config.min_order_size))
-            min_order_size_change = Decimal(str(market_config.trading_config.min_order_size_change))
-            
             quantity = (Decimal(str(amount_usd)) / price).quantize(min_order_size_change)
 
             if quantity < min_order_size:
-                logger.error(f"[BestOrderStrategy] Calculated quantity ({quantity}) is below minimum order size ({min_order_size}) for {market}")
+                logger.error("[BestOrderStrategy] Calculated quantity (%s) is below minimum order size (%s) for %s", quantity, min_order_size, market)
                 return None
 
-            logger.debug(f"[BestOrderStrategy] Placing {order_side_api.value} order for {quantity} {market} at {price} (real-time)")
+            logger.debug("[BestOrderStrategy] Placing %s order for %s %s at %s (real-time)", order_side_api.value, quantity, market, price)
             order_response = await self.trading_client.place_order(
                 market_name=market,
                 amount_of_synthetic=quantity,
@@ -81,7 +140,7 @@ class BestOrderStrategy(BaseStrategy):
             )
             
             order = order_response.data
-            logger.info(f"[BestOrderStrategy] Order placed successfully! ID: {order.id} using real-time price.")
+            logger.info("[BestOrderStrategy] Order placed successfully! ID: %s using real-time price.", order.id)
             return order.id
         
         except Exception as e:
@@ -89,7 +148,7 @@ class BestOrderStrategy(BaseStrategy):
             if "New order cost exceeds available balance" in error_message:
                 logger.error("[BestOrderStrategy] Insufficient balance to place this order")
             elif "Invalid quantity precision" in error_message:
-                 logger.error(f"[BestOrderStrategy] Invalid quantity precision for order: {quantity if 'quantity' in locals() else 'unknown'} market {market}")
+                 logger.error("[BestOrderStrategy] Invalid quantity precision for order: %s market %s", quantity if 'quantity' in locals() else 'unknown', market)
             else:
-                logger.error(f"[BestOrderStrategy] An unexpected error occurred: {error_message}", exc_info=True)
+                logger.error("[BestOrderStrategy] An unexpected error occurred: %s", error_message, exc_info=True)
             return None 
\ No newline at end of file